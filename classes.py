@@ -6,10 +6,15 @@
 
 Зависимости:
     - os: Для работы с файловой системой.
+    - concurrent.futures: Для параллельной обработки директорий.
     - typing: Для аннотаций типов.
     - PIL: Для обработки изображений.
     - pillow_heif: Для поддержки формата HEIF.
     - pillow_avif: Для поддержки формата AVIF (опционально).
+    - pyvips: Для потокового сжатия через libvips (опционально).
+    - turbojpeg: Для декодирования JPEG через libjpeg-turbo (опционально).
+    - psutil: Для определения числа физических ядер CPU (опционально).
+    - tqdm: Для индикатора прогресса при обработке директорий (опционально).
 
 Использование:
     from classes import ImageCompressor
@@ -21,8 +26,20 @@
     Перед использованием убедитесь, что установлены все необходимые зависимости.
 """
 
+import io
+import json
+import multiprocessing
 import os
-from PIL import Image
+import re
+import shutil
+import stat
+import subprocess
+import sys
+from collections import Counter
+from functools import lru_cache, partial
+from typing import Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from PIL import Image, UnidentifiedImageError
 from pillow_heif import register_heif_opener
 
 # Импорт для поддержки AVIF - самый современный формат
@@ -32,6 +49,66 @@ try:
 except ImportError:
     AVIF_AVAILABLE = False
 
+# SVT-AV1 печатает баннер и настройки в stderr на каждое изображение,
+# оставляем только ошибки (переменную читает и дочерний процесс пула)
+os.environ.setdefault("SVT_LOG", "1")
+
+# Индикатор прогресса для обработки директорий (опционально)
+try:
+    from tqdm import tqdm
+    TQDM_AVAILABLE = True
+except ImportError:
+    TQDM_AVAILABLE = False
+
+# Импорт libvips для потокового сжатия больших изображений (опционально)
+try:
+    import pyvips
+    VIPS_AVAILABLE = True
+except ImportError:
+    VIPS_AVAILABLE = False
+
+# Импорт PyTurboJPEG для декодирования JPEG напрямую через libjpeg-turbo (опционально)
+try:
+    from turbojpeg import TJPF_RGB, TurboJPEG
+    TURBOJPEG_AVAILABLE = True
+except ImportError:
+    TURBOJPEG_AVAILABLE = False
+
+# Число физических ядер для размера пула (опционально)
+try:
+    import psutil
+    PSUTIL_AVAILABLE = True
+except ImportError:
+    PSUTIL_AVAILABLE = False
+
+# Номер пункта меню -> формат вывода
+_FORMAT_CHOICES = {"1": "HEIF", "2": "WEBP", "3": "AVIF", "4": "JPEG"}
+
+# Результаты сжатия одного файла
+_WRITTEN = "written"
+_SKIPPED_LARGER = "larger"
+_SKIPPED_UP_TO_DATE = "up_to_date"
+_FAILED = "failed"
+
+# Сколько строк отчёта копится перед одной записью в stdout
+_PRINT_BATCH = 64
+
+# Файл в обрабатываемой директории со списком результатов, которые не были
+# записаны, потому что не меньше исходника: без него повторный запуск
+# сжимал бы их заново
+_SKIPPED_RECORD = ".compressor_skipped.json"
+
+# Подсказки ядру при чтении исходников есть только в POSIX-системах
+_FADVISE = hasattr(os, "posix_fadvise")
+
+# Флаг однократной регистрации HEIF в реестре форматов Pillow
+_HEIF_REGISTERED = False
+
+# Компрессор дочернего процесса и владельцы спорных выходных путей
+# задаются один раз в _init_worker
+_worker_compressor = None
+_worker_owners = {}
+
 
 class ImageCompressor:
     """
@@ -40,6 +117,7 @@ class ImageCompressor:
     Атрибуты:
         supported_formats (tuple): Поддерживаемые форматы входных изображений.
         output_formats (dict): Поддерживаемые форматы вывода с расширениями файлов.
+        input_formats (dict): Формат входного изображения по расширению файла.
 
     Методы:
         compress_image(input_path: str, output_path: str) -> None:
@@ -51,6 +129,47 @@ class ImageCompressor:
         process_input(input_path: str) -> None:
             Обрабатывает входной путь и запускает сжатие изображений.
 
+    Параметры:
+        webp_method (int): Метод кодирования WebP (0 - быстрее, 6 - меньше файл,
+            но в несколько раз медленнее). По умолчанию 4, как в Pillow.
+        avif_speed (int): Скорость кодирования AVIF (0 - меньше файл, 10 - быстрее).
+        avif_codec (str | None): Кодек AVIF, например "svt" для SVT-AV1
+            (примерно в 10 раз быстрее libaom) или "aom". None - выбор плагина.
+        use_threads (bool): Сжимать директорию в пуле потоков вместо пула
+            процессов. Кодеки отпускают GIL, а потоки не тратят время на запуск
+            процессов и передачу настроек.
+        skip_larger (bool): Не записывать результат, если он не меньше исходного
+            файла. При обходе директории файлы уже в целевом формате
+            пропускаются всегда.
+        use_vips (bool): Сжимать через libvips (pyvips) полосами, не загружая
+            изображение в память целиком. Полезно для очень больших фото.
+            Параметры webp_method, avif_speed и avif_codec передаются libvips;
+            кодек AVIF должен быть доступен в libheif, с которой собрана libvips.
+        verbose (bool): Выводить результат по каждому файлу. При обходе
+            директории с установленным tqdm выводится индикатор прогресса.
+            Ошибки выводятся всегда.
+        use_native (bool): Сжимать многопоточными консольными кодировщиками
+            avifenc, cwebp и heif-enc, если они есть в PATH и умеют читать
+            входной файл. Иначе используется Pillow.
+        skip_up_to_date (bool): Пропускать файлы, выходной файл которых новее
+            исходного, - повторный запуск продолжает прерванную обработку.
+            При обходе директории с skip_larger результаты, не записанные как
+            не меньшие исходника, запоминаются в файле .compressor_skipped.json
+            в этой директории и тоже не сжимаются повторно, пока не изменится
+            исходник или качество.
+        extra_formats (list[str] | None): Дополнительные форматы вывода при
+            обходе директории, например ["WEBP", "AVIF"]. Каждое изображение
+            декодируется один раз и кодируется во все форматы.
+        use_turbojpeg (bool): Декодировать JPEG через PyTurboJPEG (SIMD-ядра
+            libjpeg-turbo), если результат сохраняется не в JPEG. При ошибке
+            декодирования используется Pillow.
+        jpeg_lossless (bool): Сжимать JPEG в JPEG без перекодирования через
+            jpegtran (-optimize -progressive): без потерь качества и без
+            декодирования, параметр quality не применяется. При обходе
+            директории JPEG оптимизируются на месте. Нужен jpegtran из
+            libjpeg-turbo в PATH, иначе одиночный файл сжимается через Pillow,
+            а JPEG в директории пропускаются.
+
     Свойства:
         quality (int): Получает или устанавливает качество сжатия изображений.
         output_format (str): Получает или устанавливает формат выходных изображений.
@@ -58,49 +177,687 @@ class ImageCompressor:
 
     supported_formats = (".jpg", ".jpeg", ".png", ".heic", ".heif", ".avif")
     output_formats = {"HEIF": ".heic", "WEBP": ".webp", "AVIF": ".avif", "JPEG": ".jpg"}
+    # Формат входного файла по расширению: .jpeg и .jpg, .heif и .heic - одно и то же
+    input_formats = {
+        ".jpg": "JPEG",
+        ".jpeg": "JPEG",
+        ".png": "PNG",
+        ".heic": "HEIF",
+        ".heif": "HEIF",
+        ".avif": "AVIF",
+    }
+    # Нативные кодировщики: формат -> (программа, читаемые ею входные расширения)
+    _native_encoders = {
+        "AVIF": ("avifenc", (".jpg", ".jpeg", ".png")),
+        "WEBP": ("cwebp", (".jpg", ".jpeg", ".png")),
+        "HEIF": ("heif-enc", (".jpg", ".jpeg", ".png")),
+    }
+
+    # Режимы, которые кодировщик формата принимает без преобразования
+    _native_modes = {
+        "JPEG": ("RGB", "L", "YCbCr"),
+        "WEBP": ("RGB", "RGBA"),
+        "AVIF": ("RGB", "RGBA"),
+        "HEIF": ("RGB", "RGBA"),
+    }
+
+    # Параметры сжатия без потерь и предельный размер PNG, для которого его пробуем
+    _lossless_kwargs = {"WEBP": {"lossless": True}, "HEIF": {"quality": -1}}
+    _lossless_max_pixels = 512 * 512
 
-    def __init__(self, quality: int = 50, output_format: str = "HEIF"):
+    # Один проход регулярного выражения по имени файла без копии в нижнем регистре
+    _ext_re = re.compile(
+        "(?:" + "|".join(map(re.escape, supported_formats)) + ")$", re.IGNORECASE
+    )
+
+    # Фиксированный набор атрибутов: без __dict__ и без случайных опечаток,
+    # перекрывающих свойства
+    __slots__ = (
+        "__quality",
+        "__output_format",
+        "_webp_method",
+        "_avif_speed",
+        "_avif_codec",
+        "_use_threads",
+        "_skip_larger",
+        "_use_vips",
+        "_verbose",
+        "_use_native",
+        "_skip_up_to_date",
+        "_extra_formats",
+        "_use_turbojpeg",
+        "_jpeg_lossless",
+        "_save_kwargs",
+    )
+
+    def __init__(
+        self,
+        quality: int = 50,
+        output_format: str = "HEIF",
+        webp_method: int = 4,
+        avif_speed: int = 6,
+        avif_codec: Optional[str] = None,
+        use_threads: bool = False,
+        skip_larger: bool = True,
+        use_vips: bool = False,
+        verbose: bool = True,
+        use_native: bool = False,
+        skip_up_to_date: bool = True,
+        extra_formats: Optional[List[str]] = None,
+        use_turbojpeg: bool = False,
+        jpeg_lossless: bool = False,
+    ):
         self.__quality = quality
         self.__output_format = output_format.upper()
 
+        if not 0 <= webp_method <= 6:
+            raise ValueError("Метод WebP должен быть в диапазоне от 0 до 6")
+        if not 0 <= avif_speed <= 10:
+            raise ValueError("Скорость AVIF должна быть в диапазоне от 0 до 10")
+
+        self._webp_method = webp_method
+        self._avif_speed = avif_speed
+        self._avif_codec = avif_codec
+        self._use_threads = use_threads
+        self._skip_larger = skip_larger
+        self._use_vips = use_vips
+        self._verbose = verbose
+        self._use_native = use_native
+        self._skip_up_to_date = skip_up_to_date
+        self._use_turbojpeg = use_turbojpeg
+        self._jpeg_lossless = jpeg_lossless
+
+        # Дополнительные форматы вывода при обходе директории
+        self._extra_formats = ()
+        for value in extra_formats or ():
+            value = value.upper()
+            if value not in self.output_formats:
+                raise ValueError(
+                    f"Неподдерживаемый формат: {value}. "
+                    f"Поддерживаемые форматы: {', '.join(self.output_formats)}"
+                )
+            if value != self.__output_format and value not in self._extra_formats:
+                self._extra_formats += (value,)
+
+        # Дополнительные параметры кодировщиков для каждого формата
+        avif_kwargs = {"speed": avif_speed}
+        if avif_codec:
+            avif_kwargs["codec"] = avif_codec
+        self._save_kwargs = {
+            "JPEG": {"optimize": True, "progressive": True, "subsampling": "4:2:0"},
+            "WEBP": {"method": webp_method},
+            "AVIF": avif_kwargs,
+            "HEIF": {},
+        }
+
         # Инициализируем HEIF для чтения и записи
-        register_heif_opener()
+        _ensure_heif()
 
         # Проверяем поддержку AVIF для записи
-        if self.__output_format == "AVIF":
-            if not AVIF_AVAILABLE:
-                raise ImportError(
-                    "Для поддержки AVIF установите плагин: pip install pillow-avif-plugin"
-                )
+        if "AVIF" in (self.__output_format,) + self._extra_formats:
+            self._check_avif()
+
+        if use_vips and not VIPS_AVAILABLE:
+            raise ImportError("Для потокового сжатия установите: pip install pyvips")
+
+        if use_turbojpeg and not TURBOJPEG_AVAILABLE:
+            raise ImportError(
+                "Для быстрого декодирования JPEG установите: pip install PyTurboJPEG"
+            )
 
-    def compress_image(self, input_path: str, output_path: str) -> None:
+    def _check_avif(self) -> None:
+        """
+        Проверяет, что AVIF можно записывать выбранным кодеком.
+        Returns:
+            None
+        """
+        if not AVIF_AVAILABLE:
+            raise ImportError(
+                "Для поддержки AVIF установите плагин: pip install pillow-avif-plugin"
+            )
+        if self._avif_codec and self._avif_codec != "auto":
+            _check_avif_codec(self._avif_codec)
+
+    def compress_image(self, input_path: str, output_path: str) -> bool:
         """
         Сжимает изображение и сохраняет его в выбранном формате.
         Args:
             input_path (str): Путь к исходному изображению.
             output_path (str): Путь для сохранения сжатого изображения.
         Returns:
-            None
+            bool: True, если сжатый файл записан, False, если он пропущен.
+        """
+        output_format = self.__output_format
+        (status,) = self._save_variants(input_path, [(output_format, output_path)])
+        if self._verbose:
+            print(self._describe(input_path, output_path, output_format, status))
+        return status == _WRITTEN
+
+    def _describe(
+        self, input_path: str, output_path: str, output_format: str, status: str
+    ) -> str:
+        """
+        Формирует сообщение о результате сжатия одного файла.
+        Args:
+            input_path (str): Путь к исходному изображению.
+            output_path (str): Путь к сжатому изображению.
+            output_format (str): Формат сжатого изображения.
+            status (str): Результат сжатия (_WRITTEN, _SKIPPED_LARGER и т.д.).
+        Returns:
+            str: Сообщение для вывода в консоль.
+        """
+        if status == _WRITTEN:
+            return f"Сжато: {input_path} -> {output_path} (формат: {output_format})"
+        if status == _SKIPPED_UP_TO_DATE:
+            return f"Пропущено: {input_path} (уже сжат в {output_path})"
+        return f"Пропущено: {input_path} (сжатый файл не меньше исходного)"
+
+    def _targets(self, input_path: str) -> List[Tuple[str, str]]:
+        """
+        Определяет выходные файлы для изображения при обходе директории.
+
+        Форматы, совпадающие с форматом исходного файла (в том числе .jpeg при
+        выводе в JPEG), пропускаются - повторное сжатие только ухудшит качество.
+        Исключение - JPEG при jpeg_lossless: jpegtran оптимизирует его на месте
+        без потерь, если найден в PATH.
+        Args:
+            input_path (str): Путь к исходному изображению.
+        Returns:
+            List[Tuple[str, str]]: Пары (формат, путь к выходному файлу).
+        """
+        stem = input_path[: input_path.rfind(".")]
+        input_format = self.input_formats.get(input_path[len(stem) :].lower())
+        targets = []
+        # Дополнительные форматы не повторяются и не включают основной
+        for output_format in (self.__output_format,) + self._extra_formats:
+            if output_format != input_format:
+                extension = self.output_formats[output_format]
+                targets.append((output_format, stem + extension))
+            elif output_format == "JPEG" and self._jpeg_lossless_available():
+                targets.append((output_format, input_path))
+        return targets
+
+    def _jpeg_lossless_available(self) -> bool:
+        """
+        Проверяет, что JPEG можно оптимизировать без потерь через jpegtran.
+        Returns:
+            bool: True, если задан jpeg_lossless и jpegtran есть в PATH.
+        """
+        return self._jpeg_lossless and _which("jpegtran") is not None
+
+    def _save_variants(
+        self, input_path: str, targets: List[Tuple[str, str]]
+    ) -> List[str]:
+        """
+        Сохраняет изображение во всех запрошенных форматах без вывода в консоль.
+
+        Исходный файл читается одним вызовом read() и декодируется один раз для
+        всех форматов. Результат кодируется в память и записывается во
+        временный файл, который затем атомарно переименовывается в выходной -
+        прерванный запуск не оставляет битых файлов. Если задан skip_larger,
+        результат не меньше исходного файла не записывается. Если задан
+        skip_up_to_date, файлы, сжатые позже изменения исходника, пропускаются,
+        поэтому повторный запуск продолжает работу.
+        Args:
+            input_path (str): Путь к исходному изображению.
+            targets (List[Tuple[str, str]]): Пары (формат, путь к выходному файлу).
+        Returns:
+            List[str]: Коды результата для каждой пары: _WRITTEN, _SKIPPED_LARGER
+                или _SKIPPED_UP_TO_DATE.
+        """
+        statuses = []
+        data = None
+        image = None
+        try:
+            for output_format, output_path in targets:
+                if self._skip_up_to_date and _is_up_to_date(input_path, output_path):
+                    statuses.append(_SKIPPED_UP_TO_DATE)
+                    continue
+
+                if self._use_native or self._jpeg_lossless:
+                    tmp_path = _temp_path(output_path)
+                    command = self._native_command(input_path, tmp_path, output_format)
+                    if command is not None:
+                        statuses.append(
+                            self._run_native(command, input_path, tmp_path, output_path)
+                        )
+                        continue
+
+                if data is None:
+                    data = _read_source(input_path)
+
+                if self._use_vips:
+                    encoded = self._encode_vips(data, output_format)
+                else:
+                    if image is None:
+                        output_formats = [fmt for fmt, _ in targets]
+                        image = self._decode(input_path, data, output_formats)
+                    encoded = self._encode(image, output_format)
+
+                if self._skip_larger and len(encoded) >= len(data):
+                    statuses.append(_SKIPPED_LARGER)
+                    continue
+
+                _write_atomic(output_path, encoded)
+                statuses.append(_WRITTEN)
+        finally:
+            if image is not None:
+                image.close()
+        return statuses
+
+    def _native_command(
+        self, input_path: str, output_path: str, output_format: str
+    ) -> Optional[list]:
+        """
+        Формирует команду нативного кодировщика для формата.
+        Args:
+            input_path (str): Путь к исходному изображению.
+            output_path (str): Путь для сохранения сжатого изображения.
+            output_format (str): Формат сжатого изображения.
+        Returns:
+            list | None: Аргументы команды или None, если кодировщик недоступен.
+        """
+        if output_format == "JPEG":
+            # JPEG -> JPEG без потерь: jpegtran только перестраивает Хаффмана
+            executable = _which("jpegtran")
+            if (
+                not self._jpeg_lossless
+                or executable is None
+                or not input_path.lower().endswith((".jpg", ".jpeg"))
+            ):
+                return None
+            command = [executable, "-optimize", "-progressive", "-copy", "none"]
+            return command + ["-outfile", output_path, input_path]
+
+        if not self._use_native or output_format not in self._native_encoders:
+            return None
+
+        program, input_exts = self._native_encoders[output_format]
+        executable = _which(program)
+        if executable is None or not input_path.lower().endswith(input_exts):
+            return None
+
+        quality = str(self.__quality)
+        if output_format == "AVIF":
+            command = [executable, "-j", str(os.cpu_count() or 1)]
+            command += ["-s", str(self._avif_speed), "-q", quality]
+            if self._avif_codec:
+                command += ["-c", self._avif_codec]
+            return command + [input_path, output_path]
+        if output_format == "WEBP":
+            command = [executable, "-quiet", "-mt", "-q", quality]
+            command += ["-m", str(self._webp_method)]
+            return command + [input_path, "-o", output_path]
+        return [executable, "-q", quality, "-o", output_path, input_path]
+
+    def _run_native(
+        self, command: list, input_path: str, tmp_path: str, output_path: str
+    ) -> str:
+        """
+        Запускает нативный кодировщик и проверяет размер результата.
+        Args:
+            command (list): Аргументы команды кодировщика.
+            input_path (str): Путь к исходному изображению.
+            tmp_path (str): Временный файл, в который пишет кодировщик.
+            output_path (str): Путь к сжатому изображению.
+        Returns:
+            str: Результат сжатия (_WRITTEN или _SKIPPED_LARGER).
+        """
+        try:
+            result = subprocess.run(command, capture_output=True, text=True)
+            if result.returncode != 0:
+                raise RuntimeError(
+                    f"{os.path.basename(command[0])} завершился с ошибкой: "
+                    f"{result.stderr.strip()}"
+                )
+
+            if self._skip_larger and os.path.getsize(tmp_path) >= os.path.getsize(
+                input_path
+            ):
+                _remove_quietly(tmp_path)
+                return _SKIPPED_LARGER
+
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            _remove_quietly(tmp_path)
+            raise
+        return _WRITTEN
+
+    def _decode(
+        self, input_path: str, data: bytes, output_formats: List[str]
+    ) -> Image.Image:
+        """
+        Декодирует изображение через Pillow один раз для всех форматов вывода.
+        Args:
+            input_path (str): Путь к исходному изображению, для текста ошибки.
+            data (bytes): Содержимое исходного файла.
+            output_formats (List[str]): Форматы, в которые будет сжато изображение.
+        Returns:
+            Image.Image: Загруженное изображение.
+        """
+        only_jpeg = set(output_formats) == {"JPEG"}
+        if self._use_turbojpeg and not only_jpeg and data[:2] == b"\xff\xd8":
+            try:
+                pixels = _turbo_jpeg().decode(data, pixel_format=TJPF_RGB)
+            except OSError:
+                # CMYK и повреждённые файлы оставляем Pillow
+                pass
+            else:
+                img = Image.fromarray(pixels)
+                # Профиль ICC и EXIF с ориентацией читаем из заголовка, как их
+                # сохраняет путь через Pillow; пиксели Image.open не декодирует
+                with Image.open(io.BytesIO(data)) as header:
+                    for key in ("icc_profile", "exif"):
+                        if key in header.info:
+                            img.info[key] = header.info[key]
+                return img
+
+        try:
+            img = Image.open(io.BytesIO(data))
+        except UnidentifiedImageError:
+            # Без этого в ошибке вместо имени файла будет объект BytesIO
+            raise UnidentifiedImageError(
+                f"cannot identify image file {input_path!r}"
+            ) from None
+        if img.format == "JPEG" and only_jpeg:
+            # JPEG -> JPEG: libjpeg отдаёт YCbCr без преобразования в RGB
+            # и обратно при кодировании
+            img.draft("YCbCr", img.size)
+        img.load()
+        return img
+
+    def _encode(self, img: Image.Image, output_format: str) -> bytes:
+        """
+        Кодирует декодированное изображение в указанный формат.
+
+        Небольшие PNG (иконки, скриншоты) дополнительно кодируются без потерь,
+        если формат это поддерживает, и сохраняется меньший из результатов.
+        Args:
+            img (Image.Image): Декодированное изображение.
+            output_format (str): Формат сжатого изображения.
+        Returns:
+            bytes: Содержимое сжатого файла.
+        """
+        options = {"quality": self.__quality, **self._save_kwargs[output_format]}
+        try_lossless = (
+            img.format == "PNG"
+            and output_format in self._lossless_kwargs
+            and img.width * img.height < self._lossless_max_pixels
+        )
+        # Палитру, CMYK, 16 бит и т.п. конвертируем заранее одним convert()
+        # (ускорен в Pillow-SIMD) вместо неявных преобразований в плагинах
+        if img.mode not in self._native_modes[output_format]:
+            keep_alpha = output_format != "JPEG" and img.has_transparency_data
+            img = img.convert("RGBA" if keep_alpha else "RGB")
+
+        encoded = io.BytesIO()
+        img.save(encoded, output_format, **options)
+
+        if try_lossless:
+            lossless = io.BytesIO()
+            lossless_options = {**options, **self._lossless_kwargs[output_format]}
+            img.save(lossless, output_format, **lossless_options)
+            if lossless.tell() < encoded.tell():
+                encoded = lossless
+        return encoded.getvalue()
+
+    def _encode_vips(self, data: bytes, output_format: str) -> bytes:
+        """
+        Сжимает изображение через libvips с последовательным доступом.
+
+        libvips обрабатывает изображение полосами, поэтому пиковое потребление
+        памяти не зависит от его размера. Параметры кодировщиков те же, что и
+        при сжатии через Pillow, а режимы изображения libvips приводит сам.
+        Args:
+            data (bytes): Содержимое исходного файла.
+            output_format (str): Формат сжатого изображения.
+        Returns:
+            bytes: Содержимое сжатого файла.
+        """
+        extension = self.output_formats[output_format]
+        options = {"Q": self.__quality}
+        if output_format == "JPEG":
+            options.update(optimize_coding=True, interlace=True, subsample_mode="on")
+        elif output_format == "WEBP":
+            options["effort"] = self._webp_method
+        elif output_format == "AVIF":
+            # effort в libvips обратен скорости кодировщика: speed = 9 - effort
+            options["effort"] = 9 - min(self._avif_speed, 9)
+            if self._avif_codec:
+                options["encoder"] = self._avif_codec
+
+        image = pyvips.Image.new_from_buffer(data, "", access="sequential")
+        try_lossless = (
+            image.get("vips-loader") == "pngload_buffer"
+            and output_format in self._lossless_kwargs
+            and image.width * image.height < self._lossless_max_pixels
+        )
+        encoded = image.write_to_buffer(extension, **options)
+
+        if try_lossless:
+            # При последовательном доступе изображение читается один раз,
+            # поэтому для второго кодирования небольшой PNG открываем заново
+            image = pyvips.Image.new_from_buffer(data, "", access="sequential")
+            lossless = image.write_to_buffer(extension, **options, lossless=True)
+            if len(lossless) < len(encoded):
+                encoded = lossless
+        return encoded
+
+    def _iter_images(self, directory: str) -> Iterator[str]:
         """
-        with Image.open(input_path) as img:
-            img.save(output_path, self.__output_format, quality=self.__quality)
-        print(f"Сжато: {input_path} -> {output_path} (формат: {self.__output_format})")
+        Перечисляет изображения в директории и поддиректориях через os.scandir.
+
+        Тип записи берётся из DirEntry без дополнительных вызовов stat,
+        недоступные поддиректории пропускаются, как в os.walk. Обход идёт по
+        явному стеку, без цепочки вложенных генераторов на каждый уровень.
+        Args:
+            directory (str): Путь к директории для обхода.
+        Returns:
+            Iterator[str]: Пути к найденным изображениям.
+        """
+        stack = [directory]
+        while stack:
+            try:
+                entries = os.scandir(stack.pop())
+            except OSError:
+                continue
+
+            with entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file() and self._ext_re.search(entry.name):
+                        yield entry.path
 
     def process_directory(self, directory: str) -> None:
         """
         Обрабатывает все изображения в указанной директории и её поддиректориях.
+
+        Изображения сжимаются параллельно в пуле процессов (или потоков, если
+        задан use_threads) по числу физических ядер CPU.
         Args:
             directory (str): Путь к директории для обработки.
         Returns:
             None
         """
-        extension = self.output_formats[self.__output_format]
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if file.lower().endswith(self.supported_formats):
-                    input_path = os.path.join(root, file)
-                    output_path = os.path.splitext(input_path)[0] + extension
-                    self.compress_image(input_path, output_path)
+        if self._jpeg_lossless and not self._jpeg_lossless_available():
+            print("jpegtran не найден в PATH: JPEG без потерь не оптимизируются")
+
+        # Пропуски "не меньше исходника" не оставляют выходного файла, поэтому
+        # для продолжения работы они запоминаются в директории
+        record_path = None
+        skipped_record = {}
+        if self._skip_up_to_date and self._skip_larger:
+            record_path = os.path.join(directory, _SKIPPED_RECORD)
+            skipped_record = _load_skipped(record_path)
+        record_changed = False
+
+        paths = list(self._iter_images(directory))
+        all_targets = {path: self._targets(path) for path in paths}
+        # Не перезаписываем исходники, например a.jpg при сжатии a.avif в JPEG.
+        # Пути сравниваются через normcase: в Windows a.JPG и a.jpg - один файл
+        inputs = {os.path.normcase(path) for path in paths}
+        if self._skip_up_to_date:
+            # Для каждого возможного результата запоминаем исходник, из которого
+            # он получается: a.avif рядом с a.jpg при выводе в AVIF
+            producers = {
+                output_path: path
+                for path, targets in all_targets.items()
+                for _, output_path in targets
+            }
+            # Результат прошлого запуска, который новее своего исходника, сам
+            # исходником не считается и повторно не сжимается
+            paths = [
+                path
+                for path in paths
+                if path not in producers or not _is_up_to_date(producers[path], path)
+            ]
+        # Каждый выходной файл пишет только один исходник: иначе параллельные
+        # процессы пишут его одновременно (a.jpg и a.png при выводе в AVIF).
+        # В процессы передаются только спорные пути с их владельцем
+        claimed = {}
+        owners = {}
+        tasks = []
+        up_to_date = 0
+        for path in paths:
+            targets = []
+            recorded = False
+            for target in all_targets[path]:
+                key = os.path.normcase(target[1])
+                if key in inputs:
+                    # Перезапись самого исходника допустима только без потерь,
+                    # и чужой исходник не отменяет её независимо от порядка обхода
+                    if key == os.path.normcase(path):
+                        owner = owners[key] = target[1]
+                    else:
+                        owner = owners.setdefault(key, None)
+                else:
+                    owner = claimed.setdefault(key, path)
+                    if owner != path:
+                        owners[key] = owner
+                        if self._verbose:
+                            print(
+                                f"Пропущено: {path} ({target[1]} создаётся из {owner})"
+                            )
+                if owner != path:
+                    continue
+                if skipped_record and _is_recorded_skip(
+                    skipped_record, directory, path, target[1], self.__quality
+                ):
+                    # Записанный пропуск: процессы этот путь тоже не пишут
+                    owners[key] = None
+                    recorded = True
+                else:
+                    targets.append(target)
+            if not targets:
+                up_to_date += recorded
+                continue
+            # Уже сжатые файлы отсеиваем до запуска пула, не передавая их в процессы
+            if self._skip_up_to_date and all(
+                _is_up_to_date(path, output_path) for _, output_path in targets
+            ):
+                up_to_date += 1
+                continue
+            tasks.append((path, targets))
+
+        if up_to_date and self._verbose:
+            print(f"Пропущено уже сжатых изображений: {up_to_date}")
+        if not tasks:
+            return
+
+        workers = default_worker_count()
+        if self._use_threads:
+            # Потоки не копируют данные, поэтому задачи можно раздавать по одной
+            executor = ThreadPoolExecutor(max_workers=workers)
+            compress = partial(_compress_chunk, self, owners)
+            chunksize = 1
+        else:
+            # В процессы уходит только путь: настройки и владельцы спорных
+            # выходных путей передаются один раз в initializer, цели
+            # считаются на месте
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self, owners),
+            )
+            compress = _compress_worker
+            # Задачи уходят в процессы пачками: меньше обменов через очередь
+            # пула, а по 4 пачки на процесс выравнивают нагрузку
+            chunksize = max(1, len(tasks) // (4 * workers))
+
+        # С tqdm вместо строки на каждый файл выводится индикатор прогресса
+        progress = None
+        if self._verbose and TQDM_AVAILABLE:
+            progress = tqdm(total=len(tasks), unit="img")
+        # Без tqdm строки отчёта копятся и пишутся в stdout пачками, а не
+        # отдельным вызовом print на каждый файл
+        lines = []
+        # Итоги по кодам результата копятся за один проход по ответам пула
+        stats = Counter()
+
+        try:
+            with executor:
+                # Пачки принимаются по мере готовности: медленный файл не
+                # задерживает вывод результатов остальных
+                futures = {}
+                for start in range(0, len(tasks), chunksize):
+                    chunk = tasks[start : start + chunksize]
+                    input_paths = [input_path for input_path, _ in chunk]
+                    futures[executor.submit(compress, input_paths)] = chunk
+
+                for future in as_completed(futures):
+                    for (input_path, targets), (statuses, error) in zip(
+                        futures[future], future.result()
+                    ):
+                        # Индикатор учитывает и файлы с ошибкой, иначе не
+                        # дойдёт до 100%
+                        if progress is not None:
+                            progress.update()
+
+                        if error is not None:
+                            stats[_FAILED] += 1
+                            message = f"Ошибка сжатия {input_path}: {error}"
+                            if progress is not None:
+                                progress.write(message)
+                            else:
+                                lines.append(message)
+                            continue
+
+                        stats.update(statuses)
+                        if record_path is not None:
+                            record_changed |= _record_skips(
+                                skipped_record,
+                                directory,
+                                input_path,
+                                targets,
+                                statuses,
+                                self.__quality,
+                            )
+                        if progress is None and self._verbose:
+                            lines.extend(
+                                self._describe(
+                                    input_path, output_path, output_format, status
+                                )
+                                for (output_format, output_path), status in zip(
+                                    targets, statuses
+                                )
+                            )
+
+                    if len(lines) >= _PRINT_BATCH:
+                        _write_lines(lines)
+        finally:
+            if progress is not None:
+                progress.close()
+            _write_lines(lines)
+            if record_changed:
+                _save_skipped(record_path, skipped_record, directory, paths)
+
+        if self._verbose:
+            print(
+                f"Итого: сжато {stats[_WRITTEN]}, "
+                f"не меньше исходного {stats[_SKIPPED_LARGER]}, "
+                f"уже сжато {stats[_SKIPPED_UP_TO_DATE]}, ошибок {stats[_FAILED]}"
+            )
 
     def process_input(self, input_path: str) -> None:
         """
@@ -113,16 +870,22 @@ class ImageCompressor:
         input_path = input_path.strip('"')  # Удаляем кавычки, если они есть
         extension = self.output_formats[self.__output_format]
 
-        if os.path.exists(input_path):
-            if os.path.isfile(input_path):
+        # Один вызов stat вместо exists + isfile + isdir
+        try:
+            mode = os.stat(input_path).st_mode
+        except OSError:
+            print("Указанный путь не существует")
+            return
+
+        if stat.S_ISREG(mode):
+            if self._verbose:
                 print(f"Обрабатываем файл: {input_path}")
-                output_path = os.path.splitext(input_path)[0] + extension
-                self.compress_image(input_path, output_path)
-            elif os.path.isdir(input_path):
+            output_path = os.path.splitext(input_path)[0] + extension
+            self.compress_image(input_path, output_path)
+        elif stat.S_ISDIR(mode):
+            if self._verbose:
                 print(f"Обрабатываем директорию: {input_path}")
-                self.process_directory(input_path)
-        else:
-            print("Указанный путь не существует")
+            self.process_directory(input_path)
 
     @property
     def quality(self) -> int:
@@ -177,18 +940,392 @@ class ImageCompressor:
                 f"Неподдерживаемый формат. Поддерживаемые форматы: {', '.join(self.output_formats.keys())}"
             )
 
+        # Проверяем поддержку AVIF до смены формата: при ошибке компрессор
+        # остаётся с прежним форматом
+        if value == "AVIF":
+            self._check_avif()
+
         self.__output_format = value
+        # Основной формат не должен повторяться среди дополнительных
+        self._extra_formats = tuple(f for f in self._extra_formats if f != value)
 
         # Инициализируем необходимые кодеки
         # HEIF всегда инициализируем для чтения входных файлов
+        _ensure_heif()
+
+
+def _write_lines(lines: List[str]) -> None:
+    """
+    Выводит накопленные строки отчёта одной записью в stdout и очищает буфер.
+    Args:
+        lines (List[str]): Строки для вывода.
+    Returns:
+        None
+    """
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        lines.clear()
+
+
+def _load_skipped(record_path: str) -> dict:
+    """
+    Читает записанные пропуски "не меньше исходника" из директории.
+    Args:
+        record_path (str): Путь к файлу записи.
+    Returns:
+        dict: Выходной путь относительно директории -> [исходник относительно
+            директории, st_mtime_ns исходника, качество].
+    """
+    try:
+        with open(record_path, encoding="utf-8") as record_file:
+            record = json.load(record_file)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(record, dict):
+        return {}
+    # Повреждённые записи пропускаем: файл лежит рядом с изображениями
+    return {
+        key: entry
+        for key, entry in record.items()
+        if isinstance(entry, list) and len(entry) == 3
+    }
+
+
+def _is_recorded_skip(
+    record: dict, directory: str, input_path: str, output_path: str, quality: int
+) -> bool:
+    """
+    Проверяет, что результат уже был пропущен для того же исходника и качества.
+    Args:
+        record (dict): Записанные пропуски.
+        directory (str): Обрабатываемая директория.
+        input_path (str): Путь к исходному изображению.
+        output_path (str): Путь к выходному файлу.
+        quality (int): Качество сжатия.
+    Returns:
+        bool: True, если повторное сжатие не требуется.
+    """
+    entry = record.get(os.path.relpath(output_path, directory))
+    return entry == [
+        os.path.relpath(input_path, directory),
+        _mtime_ns(input_path),
+        quality,
+    ]
+
+
+def _record_skips(
+    record: dict,
+    directory: str,
+    input_path: str,
+    targets: List[Tuple[str, str]],
+    statuses: List[str],
+    quality: int,
+) -> bool:
+    """
+    Запоминает пропуски "не меньше исходника" и забывает записанные результаты.
+    Args:
+        record (dict): Записанные пропуски, изменяются на месте.
+        directory (str): Обрабатываемая директория.
+        input_path (str): Путь к исходному изображению.
+        targets (List[Tuple[str, str]]): Пары (формат, путь к выходному файлу).
+        statuses (List[str]): Коды результата для каждой пары.
+        quality (int): Качество сжатия.
+    Returns:
+        bool: True, если запись изменилась.
+    """
+    changed = False
+    for (_, output_path), status in zip(targets, statuses):
+        key = os.path.relpath(output_path, directory)
+        if status == _SKIPPED_LARGER:
+            mtime_ns = _mtime_ns(input_path)
+            if mtime_ns is not None:
+                source = os.path.relpath(input_path, directory)
+                record[key] = [source, mtime_ns, quality]
+                changed = True
+        elif status == _WRITTEN and record.pop(key, None) is not None:
+            changed = True
+    return changed
+
+
+def _save_skipped(
+    record_path: str, record: dict, directory: str, paths: List[str]
+) -> None:
+    """
+    Сохраняет записанные пропуски, отбрасывая записи удалённых исходников.
+
+    Ошибка записи (например, директория только для чтения) не прерывает
+    обработку: следующий запуск просто сожмёт эти файлы заново.
+    Args:
+        record_path (str): Путь к файлу записи.
+        record (dict): Записанные пропуски.
+        directory (str): Обрабатываемая директория.
+        paths (List[str]): Найденные при обходе изображения.
+    Returns:
+        None
+    """
+    sources = {os.path.relpath(path, directory) for path in paths}
+    record = {key: entry for key, entry in record.items() if entry[0] in sources}
+    try:
+        if record:
+            data = json.dumps(record, ensure_ascii=False)
+            _write_atomic(record_path, data.encode("utf-8"))
+        else:
+            _remove_quietly(record_path)
+    except OSError:
+        pass
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    """
+    Возвращает время изменения файла в наносекундах.
+    Args:
+        path (str): Путь к файлу.
+    Returns:
+        int | None: st_mtime_ns или None, если файл недоступен.
+    """
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _is_up_to_date(input_path: str, output_path: str) -> bool:
+    """
+    Проверяет, что выходной файл существует и сжат позже изменения исходного.
+    Args:
+        input_path (str): Путь к исходному изображению.
+        output_path (str): Путь к сжатому изображению.
+    Returns:
+        bool: True, если повторное сжатие не требуется.
+    """
+    # Перезапись файла на месте (совпадающие пути) всегда выполняется
+    if os.path.normcase(os.path.abspath(input_path)) == os.path.normcase(
+        os.path.abspath(output_path)
+    ):
+        return False
+    try:
+        return os.stat(output_path).st_mtime >= os.stat(input_path).st_mtime
+    except FileNotFoundError:
+        return False
+
+
+def _read_source(path: str) -> bytes:
+    """
+    Читает исходный файл целиком с подсказками ядру о характере чтения.
+
+    POSIX_FADV_SEQUENTIAL увеличивает окно упреждающего чтения, а после
+    чтения POSIX_FADV_DONTNEED освобождает страницы кэша: файл больше не
+    понадобится, и пакетная обработка не вытесняет из кэша полезные данные.
+    Где posix_fadvise нет (Windows, macOS), файл просто читается.
+    Args:
+        path (str): Путь к файлу.
+    Returns:
+        bytes: Содержимое файла.
+    """
+    with open(path, "rb") as source:
+        if not _FADVISE:
+            return source.read()
+        fd = source.fileno()
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        data = source.read()
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        return data
+
+
+def _temp_path(output_path: str) -> str:
+    """
+    Возвращает уникальное имя временного файла рядом с выходным.
+
+    У каждой записи свой временный файл, поэтому параллельные записи одного
+    выходного файла не смешиваются. mkstemp не используется: он создаёт файл
+    с правами 0600, которые перешли бы к результату.
+    Args:
+        output_path (str): Путь к выходному файлу.
+    Returns:
+        str: Путь к временному файлу.
+    """
+    return f"{output_path}.{os.urandom(4).hex()}.tmp"
+
+
+def _write_atomic(output_path: str, data: bytes) -> None:
+    """
+    Записывает данные во временный файл и атомарно заменяет им выходной.
+    Args:
+        output_path (str): Путь к выходному файлу.
+        data (bytes): Содержимое файла.
+    Returns:
+        None
+    """
+    tmp_path = _temp_path(output_path)
+    # "x" не даёт открыть чужой временный файл при совпадении имени, а
+    # открытие вне try не позволяет удалить его при ошибке
+    output = open(tmp_path, "xb")
+    try:
+        with output:
+            output.write(data)
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+
+
+def _remove_quietly(path: str) -> None:
+    """
+    Удаляет файл, игнорируя ошибки (например, если он не был создан).
+    Args:
+        path (str): Путь к файлу.
+    Returns:
+        None
+    """
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def default_worker_count() -> int:
+    """
+    Возвращает размер пула для сжатия: число физических ядер CPU.
+
+    SIMD-кодеки загружают ядро целиком, и второй поток SMT на том же ядре
+    почти не ускоряет работу, а только делит кэш. Без psutil используется
+    число логических ядер.
+    Returns:
+        int: Число процессов пула.
+    """
+    if PSUTIL_AVAILABLE:
+        physical = psutil.cpu_count(logical=False)
+        if physical:
+            return physical
+    return os.cpu_count() or 1
+
+
+@lru_cache(maxsize=None)
+def _which(program: str) -> Optional[str]:
+    """
+    Ищет программу в PATH один раз на процесс.
+    Args:
+        program (str): Имя исполняемого файла.
+    Returns:
+        str | None: Полный путь к программе или None, если она не найдена.
+    """
+    return shutil.which(program)
+
+
+@lru_cache(maxsize=None)
+def _turbo_jpeg() -> "TurboJPEG":
+    """
+    Загружает libturbojpeg один раз на процесс.
+    Returns:
+        TurboJPEG: Обёртка над библиотекой libjpeg-turbo.
+    """
+    return TurboJPEG()
+
+
+def _check_avif_codec(codec: str) -> None:
+    """
+    Проверяет, что кодек AVIF собран в установленном pillow-avif-plugin.
+    Args:
+        codec (str): Имя кодека, например "svt", "aom" или "rav1e".
+    Returns:
+        None
+    """
+    available = getattr(pillow_avif._avif, "encoder_codec_available", None)
+    if available is None:
+        return  # Старые версии плагина не сообщают список кодеков
+    if not available(codec):
+        raise ValueError(
+            f"Кодек AVIF {codec} недоступен в pillow-avif-plugin. "
+            f"Доступные кодеки: {pillow_avif._avif.codec_versions()}"
+        )
+
+
+def _ensure_heif() -> None:
+    """
+    Регистрирует HEIF в Pillow один раз на процесс.
+    Returns:
+        None
+    """
+    global _HEIF_REGISTERED
+    if not _HEIF_REGISTERED:
         register_heif_opener()
+        _HEIF_REGISTERED = True
 
-        # Дополнительная проверка AVIF для записи
-        if value == "AVIF":
-            if not AVIF_AVAILABLE:
-                raise ImportError(
-                    "Для поддержки AVIF установите плагин: pip install pillow-avif-plugin"
-                )
+
+def _init_worker(compressor: ImageCompressor, owners: dict) -> None:
+    """
+    Инициализирует дочерний процесс пула: регистрирует HEIF и сохраняет компрессор.
+    Args:
+        compressor (ImageCompressor): Компрессор с настройками родительского процесса.
+        owners (dict): Спорные выходные пути (через normcase) -> единственный
+            исходник, который их пишет, или None, если их писать нельзя.
+    Returns:
+        None
+    """
+    global _worker_compressor, _worker_owners
+    _ensure_heif()
+    _worker_compressor = compressor
+    _worker_owners = owners
+
+
+def _compress_worker(
+    input_paths: List[str],
+) -> List[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Сжимает пачку изображений во все запрошенные форматы в дочернем процессе пула.
+    Args:
+        input_paths (List[str]): Пути к исходным изображениям.
+    Returns:
+        List[Tuple[List[str] | None, str | None]]: Коды результата или текст
+            ошибки для каждого изображения.
+    """
+    return _compress_chunk(_worker_compressor, _worker_owners, input_paths)
+
+
+def _compress_chunk(
+    compressor: ImageCompressor, owners: dict, input_paths: List[str]
+) -> List[Tuple[Optional[List[str]], Optional[str]]]:
+    """
+    Сжимает пачку изображений во все форматы компрессора.
+    Args:
+        compressor (ImageCompressor): Компрессор с настройками.
+        owners (dict): Спорные выходные пути (через normcase) -> единственный
+            исходник, который их пишет, или None, если их писать нельзя.
+        input_paths (List[str]): Пути к исходным изображениям.
+    Returns:
+        List[Tuple[List[str] | None, str | None]]: Коды результата или текст
+            ошибки для каждого изображения.
+    """
+    results = []
+    for input_path in input_paths:
+        targets = [
+            target
+            for target in compressor._targets(input_path)
+            if owners.get(os.path.normcase(target[1]), input_path) == input_path
+        ]
+        results.append(_run_safely(compressor._save_variants, input_path, targets))
+    return results
+
+
+def _run_safely(
+    save_variants, input_path: str, targets: List[Tuple[str, str]]
+) -> Tuple[Optional[List[str]], Optional[str]]:
+    """
+    Сжимает изображение, возвращая ошибку вместо исключения.
+
+    Исключение прервало бы обработку остальных файлов пачки.
+    Args:
+        save_variants: Метод _save_variants компрессора.
+        input_path (str): Путь к исходному изображению.
+        targets (List[Tuple[str, str]]): Пары (формат, путь к выходному файлу).
+    Returns:
+        Tuple[List[str] | None, str | None]: Коды результата или текст ошибки.
+    """
+    try:
+        return save_variants(input_path, targets), None
+    except Exception as e:
+        return None, str(e)
 
 
 def main() -> None:
@@ -207,15 +1344,7 @@ def main() -> None:
     format_choice = input(
         "Введите номер формата (1-4) или нажмите Enter для HEIF по умолчанию: "
     ).strip()
-
-    if format_choice == "2":
-        output_format = "WEBP"
-    elif format_choice == "3":
-        output_format = "AVIF"
-    elif format_choice == "4":
-        output_format = "JPEG"
-    else:
-        output_format = "HEIF"
+    output_format = _FORMAT_CHOICES.get(format_choice, "HEIF")
 
     print(f"Выбран формат: {output_format}")
 
@@ -249,4 +1378,6 @@ def main() -> None:
 
 
 if __name__ == "__main__":
+    # Нужно для пула процессов в собранном PyInstaller exe на Windows
+    multiprocessing.freeze_support()
     main()
@@ -12,7 +12,7 @@ GUI пакет для компрессора изображений.
 import sys
 
 from .main_window import ImageCompressorGUI
-from .worker import CompressionWorker
+from .worker import CompressionWorker, ScannerWorker
 from .widgets import DropZone, QualityWidget, FormatWidget, FileOptionsWidget
 
 
@@ -36,6 +36,7 @@ def main():
 __all__ = [
     "ImageCompressorGUI",
     "CompressionWorker",
+    "ScannerWorker",
     "DropZone",
     "QualityWidget",
     "FormatWidget",
@@ -2,6 +2,7 @@
 Главное окно GUI компрессора изображений.
 """
 
+import os
 import sys
 from PyQt6.QtWidgets import (
     QMainWindow,
@@ -10,7 +11,7 @@ from PyQt6.QtWidgets import (
     QWidget,
     QLabel,
     QProgressBar,
-    QTextEdit,
+    QPlainTextEdit,
     QPushButton,
     QGroupBox,
     QMessageBox,
@@ -19,9 +20,9 @@ from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QFont
 
 from .widgets import DropZone, QualityWidget, FormatWidget, FileOptionsWidget
-from .worker import CompressionWorker
+from .worker import CompressionWorker, ScannerWorker
+from .utils import get_savings_info
 from .styles import BUTTON_STYLES, PROGRESS_BAR_STYLE, LOG_TEXT_STYLE, TITLE_STYLE
-from .utils import get_image_files_from_paths
 
 
 class ImageCompressorGUI(QMainWindow):
@@ -30,7 +31,11 @@ class ImageCompressorGUI(QMainWindow):
     def __init__(self):
         super().__init__()
         self.files_to_process = []
+        self._files_set = set()  # Для проверки дубликатов за O(1)
         self.worker = None
+        self._scanner = None
+        self._last_progress_pixel = 0  # Заполненная ширина полосы прогресса
+        self._pending_drops = []  # Пути, брошенные во время сканирования
         self.init_ui()
 
     def init_ui(self):
@@ -133,7 +138,10 @@ class ImageCompressorGUI(QMainWindow):
         log_group = QGroupBox("📝 Лог обработки")
         log_layout = QVBoxLayout(log_group)
 
-        self.log_text = QTextEdit()
+        self.log_text = QPlainTextEdit()
+        self.log_text.setReadOnly(True)
+        self.log_text.setUndoRedoEnabled(False)
+        self.log_text.setMaximumBlockCount(2000)  # Лог не растёт бесконечно
         self.log_text.setMaximumHeight(200)
         self.log_text.setStyleSheet(LOG_TEXT_STYLE)
         log_layout.addWidget(self.log_text)
@@ -141,38 +149,56 @@ class ImageCompressorGUI(QMainWindow):
         main_layout.addWidget(log_group)
 
     def handle_dropped_files(self, files):
-        """Обработка перетащенных файлов."""
-        # Получаем все изображения из переданных путей
-        image_files = get_image_files_from_paths(files)
+        """Обработка перетащенных файлов: сканирование в фоновом потоке."""
+        if self._scanner is not None and self._scanner.isRunning():
+            # Дождёмся окончания текущего сканирования
+            self._pending_drops.extend(files)
+            return
+
+        self.statusBar().showMessage("Поиск изображений...")
+        self._scanner = ScannerWorker(files)
+        self._scanner.paths_found.connect(self._merge_scanned)
+        self._scanner.finished.connect(self._on_scan_finished)
+        self._scanner.start()
+
+    def _on_scan_finished(self):
+        """Запускает сканирование путей, брошенных во время предыдущего."""
+        if self._pending_drops:
+            files, self._pending_drops = self._pending_drops, []
+            self.handle_dropped_files(files)
 
+    def _merge_scanned(self, image_files):
+        """Добавление найденных изображений в очередь."""
         # Добавляем новые файлы к существующим (не заменяем!)
-        new_files = []
+        queued_before = len(self.files_to_process)
         for file_path in image_files:
-            if file_path not in self.files_to_process:
-                new_files.append(file_path)
+            if file_path not in self._files_set:
+                self._files_set.add(file_path)
                 self.files_to_process.append(file_path)
+        added = len(self.files_to_process) - queued_before
+        total = len(self.files_to_process)
+
+        # Ничего нового: кнопки и зона не меняются, только сообщение
+        if not added:
+            if total:
+                self.log_text.appendPlainText("ℹ️ Выбранные файлы уже в очереди")
+                self.statusBar().showMessage(f"Готово к обработке {total} файлов")
+            else:
+                self.log_text.appendPlainText(
+                    "❌ Не найдено новых подходящих изображений"
+                )
+                self.statusBar().showMessage("Файлы не выбраны")
+            return
 
-        if new_files:
-            self.start_button.setEnabled(True)
-            self.clear_button.setEnabled(True)  # Активируем кнопку очистки
-            self.log_text.append(f"📁 Добавлено новых изображений: {len(new_files)}")
-            self.log_text.append(f"📊 Всего в очереди: {len(self.files_to_process)}")
-            self.statusBar().showMessage(
-                f"Готово к обработке {len(self.files_to_process)} файлов"
-            )
+        self.start_button.setEnabled(True)
+        self.clear_button.setEnabled(True)  # Активируем кнопку очистки
+        self.log_text.appendPlainText(
+            f"📁 Добавлено новых изображений: {added}\n📊 Всего в очереди: {total}"
+        )
+        self.statusBar().showMessage(f"Готово к обработке {total} файлов")
 
-            # Обновляем текст в зоне
-            self.drop_zone.update_label(
-                f"📁 В очереди: {len(self.files_to_process)} файлов"
-            )
-        else:
-            if not self.files_to_process:
-                self.start_button.setEnabled(False)
-                self.clear_button.setEnabled(False)
-                self.log_text.append("❌ Не найдено новых подходящих изображений")
-                self.statusBar().showMessage("Файлы не выбраны")
-            else:
-                self.log_text.append("ℹ️ Выбранные файлы уже в очереди")
+        # Обновляем текст в зоне
+        self.drop_zone.update_label(f"📁 В очереди: {total} файлов")
 
     def start_compression(self):
         """Начало процесса сжатия."""
@@ -187,41 +213,84 @@ class ImageCompressorGUI(QMainWindow):
         format_type = self.format_widget.get_selected_format()
         delete_original = self.file_options_widget.get_delete_original()
         postfix = self.file_options_widget.get_postfix()
+        skip_same_format = self.file_options_widget.get_skip_same_format()
 
         # Блокируем интерфейс
         self.start_button.setEnabled(False)
         self.stop_button.setEnabled(True)
         self.progress_bar.setValue(0)
+        self._last_progress_pixel = 0
 
         # Очищаем лог
         self.log_text.clear()
 
-        # Подсчитываем уникальные файлы
-        unique_files = list(dict.fromkeys(self.files_to_process))
-        duplicate_count = len(self.files_to_process) - len(unique_files)
+        # Очередь без дубликатов: их отсекает _files_set при добавлении.
+        # Копия нужна, чтобы новые файлы не попали в уже идущую обработку
+        files = list(self.files_to_process)
 
-        self.log_text.append(f"🚀 Начинаем сжатие {len(unique_files)} файлов...")
-        if duplicate_count > 0:
-            self.log_text.append(f"⚠️ Удалено дубликатов: {duplicate_count}")
-        self.log_text.append(f"📋 Формат: {format_type}, Качество: {quality}")
-        self.log_text.append(
+        self.log_text.appendPlainText(f"🚀 Начинаем сжатие {len(files)} файлов...")
+        self.log_text.appendPlainText(f"📋 Формат: {format_type}, Качество: {quality}")
+        self.log_text.appendPlainText(
             f"🗑️ Удалять оригиналы: {'Да' if delete_original else 'Нет'}"
         )
         if not delete_original:
-            self.log_text.append(f"📝 Постфикс: {postfix}")
-        self.log_text.append("=" * 50)
+            self.log_text.appendPlainText(f"📝 Постфикс: {postfix}")
+        self.log_text.appendPlainText("=" * 50)
 
-        # Запускаем рабочий поток с уникальными файлами
+        # Запускаем рабочий поток
         self.worker = CompressionWorker(
-            unique_files, quality, format_type, delete_original, postfix
+            files,
+            quality,
+            format_type,
+            delete_original,
+            postfix,
+            skip_same_format=skip_same_format,
         )
-        self.worker.progress_updated.connect(self.progress_bar.setValue)
-        self.worker.log_message.connect(self.log_text.append)
+        self.worker.progress_updated.connect(self._set_progress)
+        self.worker.log_message.connect(self.log_text.appendPlainText)
+        self.worker.file_result.connect(self._on_file_result)
         self.worker.finished_processing.connect(self.compression_finished)
         self.worker.start()
 
         self.statusBar().showMessage("Обработка в процессе...")
 
+    def _set_progress(self, percent: int):
+        """Обновляет полосу прогресса, только если сдвинется её заполнение."""
+        pixel = percent * self.progress_bar.width() // 100
+        if pixel != self._last_progress_pixel or percent == 100:
+            self._last_progress_pixel = pixel
+            self.progress_bar.setValue(percent)
+
+    def _on_file_result(self, result: dict):
+        """Выводит в лог результат сжатия одного файла."""
+        input_name = os.path.basename(result["input_path"])
+        output_name = os.path.basename(result["output_path"])
+        msgs = []
+
+        # Отладочная информация
+        if self.worker.verbose:
+            msgs.append(f"🔄 Обрабатываем: {result['input_path']}")
+            msgs.append(f"📁 Выходной путь: {result['output_path']}")
+
+        saved_bytes, saved_percent = get_savings_info(
+            result["original_size"], result["compressed_size"]
+        )
+
+        if saved_percent > 0:
+            msgs.append(f"✅ {input_name} -> {output_name}")
+            msgs.append(f"   💾 Экономия: {saved_bytes:,} байт ({saved_percent:.1f}%)")
+        else:
+            msgs.append(f"✅ {input_name} -> {output_name} (размер увеличился)")
+
+        if result["deleted"]:
+            msgs.append(f"🗑️ Удален оригинальный файл: {input_name}")
+        elif result["delete_error"]:
+            msgs.append(
+                f"⚠️ Не удалось удалить оригинал {input_name}: {result['delete_error']}"
+            )
+
+        self.log_text.appendPlainText("\n".join(msgs))
+
     def stop_compression(self):
         """Остановка процесса сжатия."""
         if self.worker and self.worker.isRunning():
@@ -239,30 +308,32 @@ class ImageCompressorGUI(QMainWindow):
         self.stop_button.setEnabled(False)
 
         if cancelled:
-            self.log_text.append("⏹️ Обработка отменена пользователем")
+            self.log_text.appendPlainText("⏹️ Обработка отменена пользователем")
             self.statusBar().showMessage("Обработка отменена")
         else:
-            self.log_text.append("=" * 50)
-            self.log_text.append(f"✅ Обработка завершена!")
-            self.log_text.append(f"📊 Успешно: {successful}, Ошибок: {errors}")
+            self.log_text.appendPlainText("=" * 50)
+            self.log_text.appendPlainText(f"✅ Обработка завершена!")
+            self.log_text.appendPlainText(f"📊 Успешно: {successful}, Ошибок: {errors}")
             self.statusBar().showMessage(
                 f"Готово! Обработано: {successful}, ошибок: {errors}"
             )
 
-            # Показываем результат
-            QMessageBox.information(
-                self,
-                "Обработка завершена",
-                f"Успешно обработано: {successful} файлов\nОшибок: {errors}",
-            )
+            # Показываем результат, если окно не отключено
+            if self.file_options_widget.get_notify_on_finish():
+                QMessageBox.information(
+                    self,
+                    "Обработка завершена",
+                    f"Успешно обработано: {successful} файлов\nОшибок: {errors}",
+                )
 
     def clear_queue(self):
         """Очистка очереди файлов."""
         self.files_to_process = []
+        self._files_set.clear()
         self.start_button.setEnabled(False)
         self.clear_button.setEnabled(False)
         self.drop_zone.update_label(
             "📁 Перетащите сюда файлы или папки\nили нажмите для выбора"
         )
-        self.log_text.append("🗑️ Очередь файлов очищена")
+        self.log_text.appendPlainText("🗑️ Очередь файлов очищена")
         self.statusBar().showMessage("Готов к работе")
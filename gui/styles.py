@@ -90,7 +90,7 @@ PROGRESS_BAR_STYLE = """
 """
 
 LOG_TEXT_STYLE = """
-    QTextEdit {
+    QPlainTextEdit {
         background-color: #2c3e50;
         color: #ecf0f1;
         border: 1px solid #34495e;
@@ -3,9 +3,87 @@
 """
 
 import os
-from typing import List, Tuple
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from pathlib import Path
 
+# Поддерживаемые расширения входных изображений (и фильтр диалога выбора файлов)
+IMAGE_EXTS = frozenset({".jpg", ".jpeg", ".png", ".heic", ".heif", ".avif"})
+
+# Кэш содержимого папок: путь -> (mtime_ns, изображения, подпапки), LRU
+_DIR_CACHE_SIZE = 1024
+_dir_cache = OrderedDict()
+
+
+def _list_dir(path: str) -> Optional[Tuple[List[str], List[str]]]:
+    """
+    Возвращает изображения и подпапки одной папки, используя кэш.
+
+    Запись кэша действительна, пока не изменилось время модификации папки:
+    оно меняется при добавлении, удалении и переименовании её записей.
+
+    Args:
+        path: Путь к папке
+
+    Returns:
+        Кортеж (изображения, подпапки) или None, если папка недоступна
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _dir_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        _dir_cache.move_to_end(path)
+        return cached[1], cached[2]
+
+    try:
+        entries = os.scandir(path)
+    except OSError:
+        return None
+
+    images, subdirs = [], []
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+                continue
+            # Срез по последней точке дешевле splitext на больших папках;
+            # без точки получится один символ, которого нет среди расширений
+            name = entry.name
+            if name[name.rfind(".") :].lower() in IMAGE_EXTS and entry.is_file():
+                images.append(entry.path)
+
+    _dir_cache[path] = (mtime, images, subdirs)
+    if len(_dir_cache) > _DIR_CACHE_SIZE:
+        _dir_cache.popitem(last=False)
+    return images, subdirs
+
+
+def _scan_dir(path: str, out: List[str]) -> None:
+    """
+    Добавляет в список изображения из папки и всех её подпапок через os.scandir.
+
+    Тип записи берётся из DirEntry без лишних вызовов stat, недоступные
+    папки пропускаются, как в os.walk. Обход идёт по явному стеку, поэтому
+    глубина вложенности не ограничена лимитом рекурсии. Неизменившиеся папки
+    при повторном перетаскивании берутся из кэша.
+
+    Args:
+        path: Путь к папке
+        out: Список, в который добавляются пути к изображениям
+    """
+    stack = [path]
+    while stack:
+        listing = _list_dir(stack.pop())
+        if listing is None:
+            continue
+
+        images, subdirs = listing
+        out.extend(images)
+        stack.extend(subdirs)
+
 
 def get_image_files_from_paths(file_paths: List[str]) -> List[str]:
     """
@@ -18,20 +96,15 @@ def get_image_files_from_paths(file_paths: List[str]) -> List[str]:
         Список путей к файлам изображений
     """
     image_files = []
-    supported_extensions = (".jpg", ".jpeg", ".png", ".heic", ".heif", ".avif")
 
     for file_path in file_paths:
         if os.path.isfile(file_path):
             # Проверяем, что это изображение
-            if file_path.lower().endswith(supported_extensions):
+            if os.path.splitext(file_path)[1].lower() in IMAGE_EXTS:
                 image_files.append(file_path)
         elif os.path.isdir(file_path):
             # Сканируем папку рекурсивно
-            for root, _, files_in_dir in os.walk(file_path):
-                for file in files_in_dir:
-                    if file.lower().endswith(supported_extensions):
-                        full_path = os.path.join(root, file)
-                        image_files.append(full_path)
+            _scan_dir(file_path, image_files)
 
     return image_files
 
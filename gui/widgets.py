@@ -2,7 +2,6 @@
 Виджеты для GUI компрессора изображений.
 """
 
-import os
 from typing import List
 from PyQt6.QtWidgets import (
     QFrame,
@@ -21,7 +20,7 @@ from PyQt6.QtCore import Qt, pyqtSignal
 from PyQt6.QtGui import QFont, QDragEnterEvent, QDropEvent
 
 from .styles import DROPZONE_STYLES, DROPZONE_LABEL_STYLE, QUALITY_LABEL_STYLE
-from .utils import get_image_files_from_paths
+from .utils import IMAGE_EXTS, get_image_files_from_paths
 
 
 class DropZone(QFrame):
@@ -32,8 +31,16 @@ class DropZone(QFrame):
     def __init__(self):
         super().__init__()
         self.setAcceptDrops(True)
+        self._active = False  # Подсвечена ли зона при перетаскивании
+        self._drop_in_progress = False
         self.init_ui()
 
+        # Диалог создаётся один раз и запоминает последнюю папку
+        self._file_dialog = QFileDialog(self)
+        self._file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
+        patterns = " ".join(f"*{ext}" for ext in sorted(IMAGE_EXTS))
+        self._file_dialog.setNameFilter(f"Изображения ({patterns});;Все файлы (*)")
+
     def init_ui(self):
         """Инициализация интерфейса зоны."""
         self.setFrameStyle(QFrame.Shape.Box)
@@ -55,45 +62,58 @@ class DropZone(QFrame):
         layout.addWidget(self.label)
         self.setLayout(layout)
 
-        # Обработка клика для открытия диалога
-        self.mousePressEvent = self.open_file_dialog
+    def mousePressEvent(self, event):
+        """Открывает диалог выбора файлов по клику левой кнопкой."""
+        if event.button() == Qt.MouseButton.LeftButton:
+            self._open_file_dialog()
+        else:
+            super().mousePressEvent(event)
 
     def dragEnterEvent(self, event: QDragEnterEvent):
         """Обработка начала перетаскивания."""
         if event.mimeData().hasUrls():
             event.accept()
-            self.setStyleSheet(DROPZONE_STYLES["active"])
+            self._set_active(True)
         else:
             event.ignore()
 
     def dragLeaveEvent(self, event):
         """Обработка выхода из зоны перетаскивания."""
-        self.setStyleSheet(DROPZONE_STYLES["normal"])
+        self._set_active(False)
+
+    def _set_active(self, active: bool):
+        """Переключает стиль зоны, только если состояние изменилось."""
+        if active != self._active:
+            self._active = active
+            self.setStyleSheet(DROPZONE_STYLES["active" if active else "normal"])
 
     def dropEvent(self, event: QDropEvent):
         """Обработка отпускания файлов."""
-        files = []
-        for url in event.mimeData().urls():
-            file_path = url.toLocalFile()
-            if os.path.exists(file_path):
-                files.append(file_path)
+        if self._drop_in_progress:
+            return
+
+        self._drop_in_progress = True
+        try:
+            # Существование путей проверяет фоновое сканирование,
+            # здесь только отбрасываем нелокальные ссылки
+            files = [
+                url.toLocalFile()
+                for url in event.mimeData().urls()
+                if url.isLocalFile()
+            ]
 
-        if files:
-            self.files_dropped.emit(files)
+            if files:
+                self.files_dropped.emit(files)
+        finally:
+            self._drop_in_progress = False
 
         # Возвращаем обычный стиль
         self.dragLeaveEvent(event)
 
-    def open_file_dialog(self, event):
+    def _open_file_dialog(self):
         """Открытие диалога выбора файлов."""
-        file_dialog = QFileDialog()
-        file_dialog.setFileMode(QFileDialog.FileMode.ExistingFiles)
-        file_dialog.setNameFilter(
-            "Изображения (*.jpg *.jpeg *.png *.heic *.heif *.avif);;Все файлы (*)"
-        )
-
-        if file_dialog.exec():
-            files = file_dialog.selectedFiles()
+        if self._file_dialog.exec():
+            files = self._file_dialog.selectedFiles()
             if files:
                 self.files_dropped.emit(files)
 
@@ -211,6 +231,18 @@ class FileOptionsWidget(QWidget):
         self.delete_original_checkbox.setChecked(False)  # По умолчанию НЕ удаляем
         layout.addWidget(self.delete_original_checkbox)
 
+        # Чекбокс пропуска файлов, уже сохранённых в целевом формате
+        self.skip_same_format_checkbox = QCheckBox(
+            "⏭️ Пропускать файлы уже в целевом формате"
+        )
+        self.skip_same_format_checkbox.setChecked(False)
+        layout.addWidget(self.skip_same_format_checkbox)
+
+        # Чекбокс окна с итогами: без него итог виден только в строке состояния
+        self.notify_on_finish_checkbox = QCheckBox("🔔 Показывать окно по завершении")
+        self.notify_on_finish_checkbox.setChecked(True)
+        layout.addWidget(self.notify_on_finish_checkbox)
+
         # Настройка постфикса для одинаковых расширений
         postfix_layout = QHBoxLayout()
         postfix_layout.addWidget(QLabel("📝 Постфикс при совпадении расширений:"))
@@ -230,6 +262,14 @@ class FileOptionsWidget(QWidget):
         """Получить настройку удаления оригинальных файлов."""
         return self.delete_original_checkbox.isChecked()
 
+    def get_skip_same_format(self) -> bool:
+        """Получить настройку пропуска файлов в целевом формате."""
+        return self.skip_same_format_checkbox.isChecked()
+
+    def get_notify_on_finish(self) -> bool:
+        """Получить настройку показа окна по завершении обработки."""
+        return self.notify_on_finish_checkbox.isChecked()
+
     def get_postfix(self) -> str:
         """Получить постфикс для файлов."""
         return self.postfix_input.text().strip() or "_compressed"
@@ -3,20 +3,123 @@
 """
 
 import os
-from typing import List
-from pathlib import Path
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import List, Tuple
 from PyQt6.QtCore import QThread, pyqtSignal
-from pillow_heif import register_heif_opener
 
-from classes import ImageCompressor
-from .utils import get_savings_info
+from classes import ImageCompressor, default_worker_count
+from .utils import get_image_files_from_paths
+
+# Настройки дочернего процесса пула, задаются один раз в _init_worker
+_worker_compressor = None
+_worker_delete_original = False
+_worker_postfix = ""
+_worker_extension = ""
+
+
+def _init_worker(
+    quality: int, format_type: str, delete_original: bool, postfix: str
+) -> None:
+    """Инициализирует процесс пула: создаёт компрессор с настройками запуска."""
+    global _worker_compressor, _worker_delete_original, _worker_postfix
+    global _worker_extension
+    # HEIF-декодер регистрирует сам ImageCompressor, один раз на процесс
+    # Сжимаем всегда заново: увеличение размера показываем в логе,
+    # а повторный запуск может быть с другими настройками
+    _worker_compressor = ImageCompressor(
+        quality=quality,
+        output_format=format_type,
+        skip_larger=False,
+        skip_up_to_date=False,
+        verbose=False,
+    )
+    _worker_delete_original = delete_original
+    _worker_postfix = postfix
+    # Расширение результата одно на весь запуск
+    _worker_extension = _worker_compressor.output_formats[format_type]
+
+
+def _output_path(
+    file_path: str, extension: str, delete_original: bool, postfix: str
+) -> Tuple[str, bool]:
+    """
+    Определяет путь сжатого файла строковыми операциями, без объектов Path.
+
+    Returns:
+        Путь к выходному файлу и признак перезаписи оригинала на месте
+    """
+    base_name, input_extension = os.path.splitext(file_path)
+
+    # Проверяем, совпадает ли расширение входного и выходного файла
+    if input_extension.lower() != extension.lower():
+        return base_name + extension, False
+    if delete_original:
+        # Перезаписываем оригинал на месте, сохраняя регистр расширения:
+        # в Windows "a.JPG" и "a.jpg" - один файл, удалять его нельзя
+        return file_path, True
+    # Добавляем постфикс при совпадении расширений
+    return f"{base_name}{postfix}{extension}", False
+
+
+def _compress_one(file_path: str) -> dict:
+    """
+    Сжимает один файл в процессе пула.
+
+    Returns:
+        Словарь с путями, размерами и сообщением об ошибке удаления оригинала
+    """
+    compressor = _worker_compressor
+    output_path, same_path = _output_path(
+        file_path, _worker_extension, _worker_delete_original, _worker_postfix
+    )
+
+    # Размер оригинала запоминаем до сжатия: он может быть перезаписан
+    original_size = os.stat(file_path).st_size
+
+    # Сжимаем изображение. Права на запись не проверяем заранее:
+    # os.access ненадёжен в Windows, а ошибку и так вернёт сама запись
+    try:
+        compressor.compress_image(file_path, output_path)
+    except PermissionError:
+        output_dir = os.path.dirname(output_path)
+        raise PermissionError(f"Нет прав на запись в папку: {output_dir}")
+
+    # Проверяем, что файл действительно создался
+    try:
+        compressed_size = os.stat(output_path).st_size
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Выходной файл не создался: {output_path}")
+
+    result = {
+        "input_path": file_path,
+        "output_path": output_path,
+        "original_size": original_size,
+        "compressed_size": compressed_size,
+        "deleted": False,
+        "delete_error": None,
+    }
+
+    # Удаляем оригинальный файл, если это требуется
+    if _worker_delete_original and not same_path:
+        try:
+            os.remove(file_path)
+            result["deleted"] = True
+        except Exception as e:
+            result["delete_error"] = str(e)
+
+    return result
 
 
 class CompressionWorker(QThread):
-    """Рабочий поток для сжатия изображений без блокировки UI."""
+    """Рабочий поток для сжатия изображений без блокировки UI.
+
+    Сами изображения сжимаются параллельно в пуле процессов по числу ядер CPU,
+    поток только раздаёт задачи и передаёт результаты в интерфейс.
+    """
 
     progress_updated = pyqtSignal(int)  # Прогресс в процентах
     file_processed = pyqtSignal(str)  # Имя обработанного файла
+    file_result = pyqtSignal(dict)  # Пути и размеры, форматирует интерфейс
     log_message = pyqtSignal(str)  # Сообщение для лога
     finished_processing = pyqtSignal(int, int)  # успешных, ошибок
 
@@ -27,122 +130,132 @@ class CompressionWorker(QThread):
         format_type: str,
         delete_original: bool = False,
         postfix: str = "_compressed",
+        verbose: bool = False,
+        skip_same_format: bool = False,
     ):
         super().__init__()
-        # Удаляем дубликаты из списка файлов
-        self.files = list(set(files))
+        # Очередь главного окна не содержит дубликатов
+        self.files = files
         self.quality = quality
         self.format_type = format_type
         self.delete_original = delete_original
         self.postfix = postfix
+        self.verbose = verbose  # Выводить отладочные пути в лог
+        self.skip_same_format = skip_same_format
         self.is_cancelled = False
+        self._executor = None
 
     def run(self):
         """Основной метод обработки в отдельном потоке."""
         successful = 0
         errors = 0
 
-        # Проверяем дубликаты еще раз и сообщаем об этом
-        original_count = len(self.files)
-        unique_files = list(dict.fromkeys(self.files))  # Сохраняем порядок
-        total_files = len(unique_files)
+        total_files = len(self.files)
+        processed = 0
+        last_progress = -1
 
-        if original_count != total_files:
-            duplicates_count = original_count - total_files
-            self.log_message.emit(f"⚠️ Найдено и удалено дубликатов: {duplicates_count}")
+        # Файлы уже в целевом формате не перекодируем: это самая дорогая
+        # операция, а результат обычно не меньше оригинала
+        files = self.files
+        if self.skip_same_format:
+            # Сравниваем форматы, а не расширения: .jpeg - тоже JPEG
+            input_formats = ImageCompressor.input_formats
+            files = [
+                file_path
+                for file_path in self.files
+                if input_formats.get(os.path.splitext(file_path)[1].lower())
+                != self.format_type
+            ]
+            skipped = total_files - len(files)
+            if skipped:
+                self.log_message.emit(
+                    f"⏭️ Пропущено файлов уже в формате {self.format_type}: {skipped}"
+                )
+                successful += skipped
+                processed += skipped
+                last_progress = processed * 100 // total_files
+                self.progress_updated.emit(last_progress)
 
-        try:
-            # Инициализируем HEIF для чтения входных файлов
-            register_heif_opener()
+        # Файлы сжимаются одновременно, поэтому выходной файл может писать
+        # только один файл очереди, и он не должен затирать другой файл
+        # очереди (y.PNG -> y.jpg рядом с y.jpg), даже пропущенный выше
+        extension = ImageCompressor.output_formats[self.format_type]
+        queued = {os.path.normcase(file_path) for file_path in self.files}
+        claimed = {}
+        unique_files = []
+        for file_path in files:
+            output_path, same_path = _output_path(
+                file_path, extension, self.delete_original, self.postfix
+            )
+            key = os.path.normcase(output_path)
+            overwrites_queued = key in queued and not same_path
+            if overwrites_queued or claimed.setdefault(key, file_path) != file_path:
+                errors += 1
+                processed += 1
+                self.log_message.emit(
+                    f"❌ Ошибка {os.path.basename(file_path)}: выходной файл "
+                    f"{os.path.basename(output_path)} совпадает с другим файлом очереди"
+                )
+            else:
+                unique_files.append(file_path)
+        if len(unique_files) != len(files):
+            files = unique_files
+            last_progress = processed * 100 // total_files
+            self.progress_updated.emit(last_progress)
+
+        max_workers = default_worker_count()
 
-            # Создаем компрессор
-            compressor = ImageCompressor(
-                quality=self.quality, output_format=self.format_type
+        try:
+            self._executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.quality,
+                    self.format_type,
+                    self.delete_original,
+                    self.postfix,
+                ),
             )
 
-            for i, file_path in enumerate(unique_files):
-                if self.is_cancelled:
-                    break
-
-                try:
-                    # Определяем выходной путь
-                    input_path = Path(file_path)
-                    extension = compressor.output_formats[self.format_type]
-
-                    # Проверяем, совпадает ли расширение входного и выходного файла
-                    input_extension = input_path.suffix.lower()
-                    output_extension = extension.lower()
-
-                    if input_extension == output_extension and not self.delete_original:
-                        # Добавляем постфикс при совпадении расширений
-                        base_name = input_path.stem
-                        output_path = (
-                            input_path.parent / f"{base_name}{self.postfix}{extension}"
-                        )
-                    else:
-                        output_path = input_path.with_suffix(extension)
-
-                    # Отладочная информация
-                    self.log_message.emit(f"🔄 Обрабатываем: {input_path}")
-                    self.log_message.emit(f"📁 Выходной путь: {output_path}")
-
-                    # Проверяем права на запись в папку
-                    output_dir = output_path.parent
-                    if not os.access(output_dir, os.W_OK):
-                        raise PermissionError(
-                            f"Нет прав на запись в папку: {output_dir}"
-                        )
-
-                    # Сжимаем изображение
-                    compressor.compress_image(str(input_path), str(output_path))
-
-                    # Проверяем, что файл действительно создался
-                    if output_path.exists():
-                        original_size = input_path.stat().st_size
-                        compressed_size = output_path.stat().st_size
-                        saved_bytes, saved_percent = get_savings_info(
-                            original_size, compressed_size
-                        )
-
-                        if saved_percent > 0:
-                            self.log_message.emit(
-                                f"✅ {input_path.name} -> {output_path.name}"
-                            )
-                            self.log_message.emit(
-                                f"   💾 Экономия: {saved_bytes:,} байт ({saved_percent:.1f}%)"
-                            )
-                        else:
-                            self.log_message.emit(
-                                f"✅ {input_path.name} -> {output_path.name} (размер увеличился)"
-                            )
-
-                        # Удаляем оригинальный файл, если это требуется
-                        if self.delete_original and input_path != output_path:
-                            try:
-                                input_path.unlink()
-                                self.log_message.emit(
-                                    f"🗑️ Удален оригинальный файл: {input_path.name}"
-                                )
-                            except Exception as e:
-                                self.log_message.emit(
-                                    f"⚠️ Не удалось удалить оригинал {input_path.name}: {str(e)}"
-                                )
-
-                        successful += 1
-                    else:
-                        raise FileNotFoundError(
-                            f"Выходной файл не создался: {output_path}"
-                        )
-
-                    self.file_processed.emit(input_path.name)
-
-                except Exception as e:
-                    errors += 1
-                    self.log_message.emit(f"❌ Ошибка {Path(file_path).name}: {str(e)}")
-
-                # Обновляем прогресс
-                progress = int(((i + 1) / total_files) * 100)
-                self.progress_updated.emit(progress)
+            with self._executor as executor:
+                # Держим в пуле не больше 2 * max_workers задач, чтобы память
+                # не росла вместе с размером очереди
+                pending_files = iter(files)
+                in_flight = {}
+
+                def submit_next():
+                    file_path = next(pending_files, None)
+                    if file_path is not None:
+                        future = executor.submit(_compress_one, file_path)
+                        in_flight[future] = file_path
+
+                for _ in range(2 * max_workers):
+                    submit_next()
+
+                while in_flight and not self.is_cancelled:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                    for future in done:
+                        file_name = os.path.basename(in_flight.pop(future))
+                        try:
+                            result = future.result()
+                            self.file_result.emit(result)
+                            successful += 1
+                            self.file_processed.emit(file_name)
+
+                        except Exception as e:
+                            errors += 1
+                            self.log_message.emit(f"❌ Ошибка {file_name}: {str(e)}")
+
+                        if not self.is_cancelled:
+                            submit_next()
+
+                        # Обновляем прогресс, только если изменился процент
+                        processed += 1
+                        progress = processed * 100 // total_files
+                        if progress != last_progress:
+                            last_progress = progress
+                            self.progress_updated.emit(progress)
 
         except Exception as e:
             self.log_message.emit(f"❌ Критическая ошибка: {str(e)}")
@@ -150,5 +263,21 @@ class CompressionWorker(QThread):
         self.finished_processing.emit(successful, errors)
 
     def cancel(self):
-        """Отменяет обработку."""
+        """Отменяет обработку: ожидающие в пуле файлы снимаются с очереди."""
         self.is_cancelled = True
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ScannerWorker(QThread):
+    """Фоновый поток для поиска изображений в перетащенных файлах и папках."""
+
+    paths_found = pyqtSignal(list)  # Найденные изображения
+
+    def __init__(self, roots: List[str]):
+        super().__init__()
+        self.roots = roots
+
+    def run(self):
+        """Рекурсивно сканирует пути, не блокируя UI."""
+        self.paths_found.emit(get_image_files_from_paths(self.roots))
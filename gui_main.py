@@ -3,7 +3,12 @@
 Простой запуск графического интерфейса.
 """
 
+import multiprocessing
+
 if __name__ == "__main__":
+    # Нужно для пула процессов в собранном PyInstaller exe на Windows
+    multiprocessing.freeze_support()
+
     try:
         from gui import main
 
@@ -18,5 +18,5 @@ if not exist "classes.py" (
     exit /b 1
 )
 
-python main.py
+python classes.py
 pause
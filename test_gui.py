@@ -31,12 +31,12 @@ def main():
 
     # Проверяем файлы
     current_dir = os.path.dirname(os.path.abspath(__file__))
-    gui_file = os.path.join(current_dir, "gui.py")
+    gui_file = os.path.join(current_dir, "gui", "__init__.py")
 
     if os.path.exists(gui_file):
-        print("✅ Файл gui.py найден")
+        print("✅ Пакет gui найден")
     else:
-        print("❌ Файл gui.py не найден!")
+        print("❌ Пакет gui не найден!")
         return
 
     print("\n📋 ИНСТРУКЦИИ ДЛЯ ТЕСТИРОВАНИЯ:")